@@ -8,16 +8,22 @@ LOGS_KEY_PREFIX = "logs/"
 DATA_BUCKET = "nyc-collisions-ecc"
 RAW_DATA_PREFIX = "raw_data"
 PROCESSED_DATA_PREFIX = "processed_data"
+PROCESSED_DATA_FORMAT = "parquet"  # "parquet" or "csv" (gzipped CSV)
+RECORDS_PER_FILE = 250000  # target records per processed data file
+MAX_OUTPUT_FILES = 200
 
 # Socrata API Configuration
 BASE_URL = "https://data.cityofnewyork.us/resource/h9gi-nx95.json"
 LIMIT = 50000
+DOWNLOAD_WORKERS = 16
 
 # Redshift Configuration (Update these values)
 REDSHIFT_HOST = "default-workgroup.340752835797.us-east-2.redshift-serverless.amazonaws.com"  # e.g. mycluster.abc123xyz.us-east-1.redshift.amazonaws.com
 REDSHIFT_PORT = 5439
 REDSHIFT_DB = "dev"
-REDSHIFT_USER = "admin"
-REDSHIFT_PASSWORD = "XXXXX"
+REDSHIFT_WORKGROUP = "default-workgroup"  # credentials are issued via IAM for this workgroup
+REDSHIFT_REGION = "us-east-2"  # region of the workgroup
 REDSHIFT_IAM_ROLE = "arn:aws:iam::340752835797:role/service-role/AmazonRedshift-CommandsAccessRole-20241204T130545"
 REDSHIFT_TABLE = "public.collisions"
+REDSHIFT_STATEMENT_TIMEOUT_MS = 3600000
+REDSHIFT_SLICES = 8  # total slices across the cluster, used to size the output
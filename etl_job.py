@@ -1,24 +1,36 @@
 import requests
+import atexit
 import json
 import logging
+import math
+import queue
 import boto3
 import psycopg2
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pyspark.sql.functions import (
     col,
     to_timestamp,
     to_date,
     concat_ws,
+    substring,
     hour,
     month,
     year,
     dayofweek,
     when,
+    coalesce,
+    lit,
     to_json,
-    max as spark_max,
 )
 
 from pyspark.sql import SparkSession
+from pyspark.sql.types import StringType, StructField, StructType
 
 # Import all configuration constants from config.py
 from config import (
@@ -27,16 +39,23 @@ from config import (
     LOGS_BUCKET,
     LOGS_KEY_PREFIX,
     DATA_BUCKET,
+    RAW_DATA_PREFIX,
     PROCESSED_DATA_PREFIX,
+    PROCESSED_DATA_FORMAT,
     BASE_URL,
     LIMIT,
+    DOWNLOAD_WORKERS,
     REDSHIFT_HOST,
     REDSHIFT_PORT,
     REDSHIFT_DB,
-    REDSHIFT_USER,
-    REDSHIFT_PASSWORD,
+    REDSHIFT_WORKGROUP,
+    REDSHIFT_REGION,
     REDSHIFT_IAM_ROLE,
     REDSHIFT_TABLE,
+    REDSHIFT_STATEMENT_TIMEOUT_MS,
+    REDSHIFT_SLICES,
+    RECORDS_PER_FILE,
+    MAX_OUTPUT_FILES,
 )
 
 # ---------------------
@@ -49,18 +68,110 @@ logger.setLevel(logging.INFO)
 file_handler = logging.FileHandler(log_file)
 formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+# Log records are queued and written to the file by a background thread, so
+# logging calls never block on disk I/O
+log_queue = queue.Queue(-1)
+logger.addHandler(QueueHandler(log_queue))
+log_listener = QueueListener(log_queue, file_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logger.info("Starting NYC Crashes Data ETL")
 
+# Each run stages its raw pages, and writes its processed files and COPY
+# manifest, under its own prefix
+raw_run_prefix = f"{RAW_DATA_PREFIX}/run={timestamp}/"
+run_prefix = f"{PROCESSED_DATA_PREFIX}/run={timestamp}/"
+
 # Initialize SparkSession (assuming Spark is already available)
 spark = SparkSession.builder.getOrCreate()
-spark.conf.set("spark.sql.legacy.timeParserPolicy", "LEGACY")
+# Use the modern datetime parser; unparseable values become null
+spark.conf.set("spark.sql.legacy.timeParserPolicy", "CORRECTED")
+spark.conf.set("spark.sql.files.maxRecordsPerFile", RECORDS_PER_FILE)
+# Input sizes vary from a few KB to GB between runs, so let AQE size the
+# partitions, and keep whole-stage codegen enabled for the wide projections
+spark.conf.set("spark.sql.adaptive.enabled", "true")
+spark.conf.set("spark.sql.adaptive.coalescePartitions.enabled", "true")
+spark.conf.set("spark.sql.adaptive.advisoryPartitionSizeInBytes", "128m")
+spark.conf.set("spark.sql.codegen.wholeStage", "true")
+spark.conf.set("spark.sql.codegen.maxFields", 200)
+
+# Shared S3 client, reused by every S3 call so its connection pool persists
+s3 = boto3.client(
+    "s3",
+    config=Config(
+        tcp_keepalive=True,
+        max_pool_connections=32,
+        retries={"max_attempts": 10, "mode": "adaptive"},
+    ),
+)
+
+# Redshift connection, opened on first use and reused for later loads
+redshift_conn = None
+
+# Shared HTTP session so page downloads reuse pooled keep-alive connections
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=DOWNLOAD_WORKERS,
+        pool_maxsize=DOWNLOAD_WORKERS,
+        max_retries=Retry(
+            total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]
+        ),
+    ),
+)
+
+# Explicit schema for the Socrata records so Spark does not have to scan the
+# staged pages to infer types. It lists only the fields the transform uses,
+# so anything else is neither downloaded nor read. Every field arrives as a
+# string except location, which is a nested object.
+SOCRATA_SCHEMA = StructType(
+    [
+        StructField("crash_date", StringType()),
+        StructField("crash_time", StringType()),
+        StructField("borough", StringType()),
+        StructField("zip_code", StringType()),
+        StructField("latitude", StringType()),
+        StructField("longitude", StringType()),
+        StructField(
+            "location",
+            StructType(
+                [
+                    StructField("latitude", StringType()),
+                    StructField("longitude", StringType()),
+                    StructField("human_address", StringType()),
+                ]
+            ),
+        ),
+        StructField("on_street_name", StringType()),
+        StructField("cross_street_name", StringType()),
+        StructField("off_street_name", StringType()),
+        StructField("number_of_persons_injured", StringType()),
+        StructField("number_of_persons_killed", StringType()),
+        StructField("number_of_pedestrians_injured", StringType()),
+        StructField("number_of_pedestrians_killed", StringType()),
+        StructField("number_of_cyclist_injured", StringType()),
+        StructField("number_of_cyclist_killed", StringType()),
+        StructField("number_of_motorist_injured", StringType()),
+        StructField("number_of_motorist_killed", StringType()),
+        StructField("contributing_factor_vehicle_1", StringType()),
+        StructField("contributing_factor_vehicle_2", StringType()),
+        StructField("contributing_factor_vehicle_3", StringType()),
+        StructField("contributing_factor_vehicle_4", StringType()),
+        StructField("contributing_factor_vehicle_5", StringType()),
+        StructField("collision_id", StringType()),
+        StructField("vehicle_type_code1", StringType()),
+        StructField("vehicle_type_code2", StringType()),
+        StructField("vehicle_type_code_3", StringType()),
+        StructField("vehicle_type_code_4", StringType()),
+        StructField("vehicle_type_code_5", StringType()),
+    ]
+)
 
 
 def read_last_collision_date():
     """Read the last collision date from the S3 JSON configuration file using boto3."""
-    s3 = boto3.client("s3")
     logger.info(
         f"Reading last_collision_date from s3://{CONFIG_BUCKET}/{CONFIG_FILE_KEY}"
     )
@@ -74,61 +185,104 @@ def read_last_collision_date():
 
 def update_last_collision_date(new_date):
     """Update the last collision date in the S3 JSON configuration file."""
-    s3 = boto3.client("s3")
     content = json.dumps({"last_collision_date": new_date})
     s3.put_object(Bucket=CONFIG_BUCKET, Key=CONFIG_FILE_KEY, Body=content)
     logger.info(f"Updated last_collision_date to {new_date} and saved to S3.")
 
 
-def download_new_data(last_collision_date):
-    """Download new data from Socrata API since last_collision_date, return as Spark DataFrame."""
-    offset = 0
-    all_data_df = None
-    logger.info("Starting data download from Socrata.")
+def new_data_filter(last_collision_date, max_collision_date=None):
+    """Return the SoQL filter selecting the records to load since last_collision_date."""
+    # Records without a collision_id are dropped by the transform, so filter
+    # them out server-side rather than downloading them
+    where = f"crash_date > '{last_collision_date}' AND collision_id IS NOT NULL"
+    if max_collision_date is not None:
+        # Bound the download to the stats snapshot so rows published after it
+        # are left for the next run instead of being loaded twice
+        where += f" AND crash_date <= '{max_collision_date}'"
+    return where
+
+
+def query_new_data_stats(last_collision_date):
+    """Return the count and latest crash_date of new records from the Socrata API."""
+    query_params = {
+        "$select": "count(*) AS n, max(crash_date) AS max_crash_date",
+        "$where": new_data_filter(last_collision_date),
+    }
+    response = session.get(BASE_URL, params=query_params)
+    response.raise_for_status()
+    stats = response.json()[0]
+    total_records = int(stats["n"])
+    if total_records == 0:
+        return 0, None
+    return total_records, stats["max_crash_date"].split("T")[0]
+
+
+def download_page(last_collision_date, max_collision_date, page):
+    """Download a single page of records from the Socrata API and stage it in S3."""
+    query_params = {
+        # Only request the fields the transform uses
+        "$select": ",".join(SOCRATA_SCHEMA.fieldNames()),
+        "$where": new_data_filter(last_collision_date, max_collision_date),
+        "$order": ":id",
+        "$limit": LIMIT,
+        "$offset": page * LIMIT,
+    }
+
+    response = session.get(BASE_URL, params=query_params)
+    response.raise_for_status()
+    # Store the raw response as-is so parsing happens on the executors
+    s3.put_object(
+        Bucket=DATA_BUCKET,
+        Key=f"{raw_run_prefix}page_{page:05d}.json",
+        Body=response.content,
+    )
+    logger.info(f"Downloaded page {page} ({len(response.content)} bytes)")
 
-    while True:
-        query_params = {
-            "$where": f"crash_date > '{last_collision_date}'",
-            "$limit": LIMIT,
-            "$offset": offset,
-        }
 
-        response = requests.get(BASE_URL, params=query_params)
+def download_new_data(last_collision_date, max_collision_date, total_records):
+    """Download new data from Socrata API in (last_collision_date, max_collision_date], return as Spark DataFrame."""
+    logger.info("Starting data download from Socrata.")
 
-        if response.status_code != 200:
-            logger.error(
-                f"Failed to download data. Status code: {response.status_code}"
+    # Pages are ordered by :id so each offset window can be fetched independently
+    n_pages = math.ceil(total_records / LIMIT)
+    logger.info(f"Downloading {total_records} records in {n_pages} pages.")
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        # Consume the results so any download error is raised here
+        list(
+            executor.map(
+                lambda page: download_page(
+                    last_collision_date, max_collision_date, page
+                ),
+                range(n_pages),
             )
-            break
-
-        data = response.json()
-
-        if not data:
-            logger.info("No more new data to download.")
-            break
-
-        batch_df = spark.createDataFrame(data)
+        )
 
-        if all_data_df is None:
-            all_data_df = batch_df
-        else:
-            all_data_df = all_data_df.unionByName(batch_df)
+    # Read all staged pages as a single DataFrame. Each page is a JSON array,
+    # hence multiLine; the explicit schema avoids an inference pass.
+    raw_data_path = f"s3://{DATA_BUCKET}/{raw_run_prefix}"
+    logger.info(f"Raw data staged to {raw_data_path}")
+    return spark.read.schema(SOCRATA_SCHEMA).option("multiLine", True).json(
+        raw_data_path
+    )
 
-        offset += LIMIT
-        logger.info(
-            f"Downloaded a batch of {len(data)} records, offset is now {offset}"
-        )
 
-    return all_data_df
+def output_file_count(record_count):
+    """Return the number of files to write for a run of record_count records."""
+    target_files = math.ceil(record_count / RECORDS_PER_FILE)
+    if target_files <= 1:
+        return 1
+    # Round up to a multiple of the slice count so no slice sits idle
+    target_files = math.ceil(target_files / REDSHIFT_SLICES) * REDSHIFT_SLICES
+    return min(target_files, MAX_OUTPUT_FILES)
 
 
-def transform_data(data):
+def transform_data(data, record_count):
+    # 1. Drop records without a collision_id
     data = data.dropna(subset=["collision_id"])
 
-    # 2. Cast collision_id to integer
-    data = data.withColumn("collision_id", col("collision_id").cast("int"))
-
-    # 3. Cast relevant columns to integer
+    # 2. Cast and parse the source columns and compute the injury and fatality
+    # totals in a single projection
     int_cols = [
         "number_of_persons_injured",
         "number_of_persons_killed",
@@ -139,80 +293,70 @@ def transform_data(data):
         "number_of_motorist_injured",
         "number_of_motorist_killed",
     ]
-    for c in int_cols:
-        if c in data.columns:
-            data = data.withColumn(c, col(c).cast("int"))
-
-    # 4. Parse and create crash_timestamp
-    # Assuming crash_date is in 'yyyy-MM-dd' format and crash_time is in 'HH:mm' format
-    data = data.withColumn("crash_date", to_date(col("crash_date"), "yyyy-MM-dd"))
-    data = data.withColumn(
-        "crash_timestamp",
-        to_timestamp(
-            concat_ws(" ", col("crash_date"), col("crash_time")), "yyyy-MM-dd HH:mm"
-        ),
-    )
-
-    # 5. Extract year, month, day_of_week from crash_timestamp
-    data = (
-        data.withColumn("year", year(col("crash_timestamp")))
-        .withColumn("month", month(col("crash_timestamp")))
-        .withColumn("day_of_week", dayofweek(col("crash_timestamp")))
+    # crash_date arrives as 'yyyy-MM-ddT00:00:00.000' and crash_time as 'H:mm', so
+    # parse the timestamp in one pass from the raw strings and derive the date
+    # from it, falling back to the date alone when crash_time is missing
+    crash_day = substring(col("crash_date"), 1, 10)
+    crash_timestamp = to_timestamp(
+        concat_ws(" ", crash_day, col("crash_time")), "yyyy-MM-dd H:mm"
     )
-
-    # 6. Determine if the crash occurred on a weekend
-    data = data.withColumn(
-        "is_weekend",
-        when((col("day_of_week") == 1) | (col("day_of_week") == 7), True).otherwise(
-            False
-        ),
+    crash_date = coalesce(to_date(crash_timestamp), to_date(crash_day, "yyyy-MM-dd"))
+    source_exprs = {
+        "collision_id": col("collision_id").cast("int"),
+        **{c: col(c).cast("int") for c in int_cols},
+        "crash_date": crash_date,
+        "latitude": col("latitude").cast("double"),
+        "longitude": col("longitude").cast("double"),
+        # Convert location struct to JSON string
+        "location": to_json(col("location")),
+    }
+    total_injuries = (
+        source_exprs["number_of_persons_injured"]
+        + source_exprs["number_of_pedestrians_injured"]
+        + source_exprs["number_of_cyclist_injured"]
+        + source_exprs["number_of_motorist_injured"]
     )
-
-    # 7. Categorize the time of day
-    data = data.withColumn("hour", hour(col("crash_timestamp")))
-    data = data.withColumn(
-        "time_of_day",
-        when((col("hour") >= 0) & (col("hour") < 6), "Late Night")
-        .when((col("hour") >= 6) & (col("hour") < 12), "Morning")
-        .when((col("hour") >= 12) & (col("hour") < 17), "Afternoon")
-        .when((col("hour") >= 17) & (col("hour") < 21), "Evening")
-        .otherwise("Night"),
+    total_fatalities = (
+        source_exprs["number_of_persons_killed"]
+        + source_exprs["number_of_pedestrians_killed"]
+        + source_exprs["number_of_cyclist_killed"]
+        + source_exprs["number_of_motorist_killed"]
     )
-
-    # 8. Calculate total_injuries and total_fatalities
-    data = data.withColumn(
-        "total_injuries",
-        col("number_of_persons_injured")
-        + col("number_of_pedestrians_injured")
-        + col("number_of_cyclist_injured")
-        + col("number_of_motorist_injured"),
+    data = data.select(
+        *[
+            source_exprs[c].alias(c) if c in source_exprs else col(c)
+            for c in data.columns
+        ],
+        crash_timestamp.alias("crash_timestamp"),
+        total_injuries.alias("total_injuries"),
+        total_fatalities.alias("total_fatalities"),
+        # Materialized once so severity_category does not re-add the totals
+        (total_injuries + total_fatalities).alias("severity_sum"),
     )
 
-    data = data.withColumn(
-        "total_fatalities",
-        col("number_of_persons_killed")
-        + col("number_of_pedestrians_killed")
-        + col("number_of_cyclist_killed")
-        + col("number_of_motorist_killed"),
-    )
-
-    # 9. Categorize severity
-    data = data.withColumn(
-        "severity_category",
-        when((col("total_injuries") + col("total_fatalities")) == 0, "Minor")
-        .when((col("total_injuries") + col("total_fatalities")) <= 2, "Moderate")
+    # 3. Derive the calendar, time of day and severity category columns
+    crash_hour = hour(col("crash_timestamp"))
+    derived_exprs = {
+        "year": year(col("crash_timestamp")),
+        "month": month(col("crash_timestamp")),
+        "day_of_week": dayofweek(col("crash_timestamp")),
+        # Sunday is 1 and Saturday is 7; a missing timestamp is not a weekend
+        "is_weekend": coalesce(
+            dayofweek(col("crash_timestamp")).isin(1, 7), lit(False)
+        ),
+        # Thresholds are checked in increasing order, so one comparison per branch
+        "time_of_day": when(crash_hour < 6, "Late Night")
+        .when(crash_hour < 12, "Morning")
+        .when(crash_hour < 17, "Afternoon")
+        .when(crash_hour < 21, "Evening")
+        .otherwise("Night"),
+        "severity_category": when(col("severity_sum") == 0, "Minor")
+        .when(col("severity_sum") <= 2, "Moderate")
         .otherwise("Severe"),
-    )
-
-    # 10. Cast latitude and longitude to double
-    data = data.withColumn("latitude", col("latitude").cast("double"))
-    data = data.withColumn("longitude", col("longitude").cast("double"))
+    }
 
-    # 11. Convert location MapType to JSON string
-    if "location" in data.columns:
-        data = data.withColumn("location", to_json(col("location")))
-
-    # 12. Select and order the desired columns
+    # 4. Select and order the desired columns, computing the derived ones in
+    # the same projection
     desired_columns = [
         "collision_id",
         "crash_timestamp",
@@ -254,49 +398,175 @@ def transform_data(data):
         "vehicle_type_code_5",
     ]
 
-    existing_columns = [c for c in desired_columns if c in data.columns]
-    data = data.select(existing_columns)
+    data = data.select(
+        [
+            derived_exprs[c].alias(c) if c in derived_exprs else col(c)
+            for c in desired_columns
+        ]
+    )
 
-    # 13. Write the transformed DataFrame to S3 in Parquet format
+    # 5. Size the output files for the run: a single file for small deltas,
+    # otherwise a multiple of the Redshift slice count so COPY keeps every
+    # slice busy
+    target_files = output_file_count(record_count)
+    num_partitions = data.rdd.getNumPartitions()
+    if target_files < num_partitions:
+        data = data.coalesce(target_files)
+    elif target_files > num_partitions:
+        data = data.repartition(target_files)
+
+    # 6. Write the transformed DataFrame to S3 in Parquet or gzipped CSV format
     # Ensure to use 's3://' prefix for Redshift compatibility
-    processed_data_path = f"s3://{DATA_BUCKET}/{PROCESSED_DATA_PREFIX}/"
-    data.write.mode("overwrite").format("parquet").save(processed_data_path)
+    # Each run writes to its own subdirectory so COPY only reads the new files
+    processed_data_path = f"s3://{DATA_BUCKET}/{run_prefix}"
+    if PROCESSED_DATA_FORMAT == "csv":
+        (
+            data.write.mode("append")
+            .option("compression", "gzip")
+            .option("header", "false")
+            .option("escape", '"')
+            .option("nullValue", "\\N")
+            .option("timestampFormat", "yyyy-MM-dd HH:mm:ss")
+            .csv(processed_data_path)
+        )
+    else:
+        # 128 MB row groups and dictionary encoding for the many low-cardinality
+        # string columns (borough, contributing factors, vehicle types)
+        (
+            data.write.mode("append")
+            .option("compression", "snappy")
+            .option("parquet.block.size", 128 * 1024 * 1024)
+            .option("parquet.enable.dictionary", "true")
+            .parquet(processed_data_path)
+        )
     logger.info(f"Processed data saved to {processed_data_path}")
     return processed_data_path
 
 
-def load_data_into_redshift(processed_data_path):
-    """Run a Redshift COPY command to load processed data into the Redshift table."""
-    # Construct the COPY command
-    copy_command = f"""
-    COPY {REDSHIFT_TABLE}
-    FROM '{processed_data_path}'
-    IAM_ROLE '{REDSHIFT_IAM_ROLE}'
-    FORMAT AS PARQUET;
-    """
+def write_manifest():
+    """Write a COPY manifest listing the data files produced by this run."""
+    file_suffix = ".csv.gz" if PROCESSED_DATA_FORMAT == "csv" else ".parquet"
+    paginator = s3.get_paginator("list_objects_v2")
+    entries = []
+    for page in paginator.paginate(Bucket=DATA_BUCKET, Prefix=run_prefix):
+        for obj in page.get("Contents", []):
+            if not obj["Key"].endswith(file_suffix):
+                continue
+            # content_length is required in manifests for columnar formats
+            entries.append(
+                {
+                    "url": f"s3://{DATA_BUCKET}/{obj['Key']}",
+                    "mandatory": True,
+                    "meta": {"content_length": obj["Size"]},
+                }
+            )
 
-    # Connect to Redshift and run the COPY
-    conn = psycopg2.connect(
+    manifest_key = f"{run_prefix}manifest.json"
+    s3.put_object(
+        Bucket=DATA_BUCKET,
+        Key=manifest_key,
+        Body=json.dumps({"entries": entries}),
+    )
+    manifest_path = f"s3://{DATA_BUCKET}/{manifest_key}"
+    logger.info(f"Wrote manifest with {len(entries)} files to {manifest_path}")
+    return manifest_path
+
+
+def get_redshift_connection():
+    """Return the cached Redshift connection, (re)connecting if it is missing or dead."""
+    global redshift_conn
+    if redshift_conn is not None and not redshift_conn.closed:
+        try:
+            with redshift_conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            redshift_conn.rollback()
+            return redshift_conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            logger.warning("Cached Redshift connection is unusable, reconnecting.")
+            close_redshift_connection()
+
+    # Temporary IAM credentials, so no database password is stored in config.
+    # The client is built here rather than at import so a failure is logged.
+    redshift_serverless = boto3.client(
+        "redshift-serverless", region_name=REDSHIFT_REGION
+    )
+    creds = redshift_serverless.get_credentials(
+        workgroupName=REDSHIFT_WORKGROUP, dbName=REDSHIFT_DB
+    )
+    redshift_conn = psycopg2.connect(
         host=REDSHIFT_HOST,
         port=REDSHIFT_PORT,
         dbname=REDSHIFT_DB,
-        user=REDSHIFT_USER,
-        password=REDSHIFT_PASSWORD,
+        user=creds["dbUser"],
+        password=creds["dbPassword"],
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=5,
     )
-    conn.autocommit = True
-    cur = conn.cursor()
+    with redshift_conn:
+        with redshift_conn.cursor() as cur:
+            cur.execute("SET enable_result_cache_for_session TO off;")
+            cur.execute(f"SET statement_timeout TO {REDSHIFT_STATEMENT_TIMEOUT_MS};")
+    logger.info("Connected to Redshift.")
+    return redshift_conn
+
+
+def close_redshift_connection():
+    """Close the cached Redshift connection, if any."""
+    global redshift_conn
+    if redshift_conn is not None:
+        try:
+            redshift_conn.close()
+        finally:
+            redshift_conn = None
+
+
+def load_data_into_redshift(manifest_path):
+    """Run a Redshift COPY command to load the files in the manifest into the Redshift table."""
+    if PROCESSED_DATA_FORMAT == "csv":
+        format_options = "FORMAT AS CSV GZIP NULL AS '\\N' TIMEFORMAT 'auto'"
+    else:
+        format_options = "FORMAT AS PARQUET"
+
+    # Construct the COPY command. Column encodings are fixed by the table
+    # definition and statistics are maintained by Redshift's automatic
+    # analyze, so skip both analysis passes on every incremental load.
+    copy_command = f"""
+    COPY {REDSHIFT_TABLE}
+    FROM '{manifest_path}'
+    IAM_ROLE '{REDSHIFT_IAM_ROLE}'
+    {format_options}
+    MANIFEST
+    COMPUPDATE OFF
+    STATUPDATE OFF;
+    """
+
+    # Run the COPY in an explicit transaction so a failed load leaves no partial rows
+    conn = get_redshift_connection()
     logger.info("Running Redshift COPY command.")
-    cur.execute(copy_command)
-    cur.close()
-    conn.close()
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute(copy_command)
     logger.info("Data successfully loaded into Redshift.")
 
 
 def upload_logs_to_s3():
     """Upload log file to S3."""
     logger.info("Uploading log file to S3.")
-    s3_client = boto3.client("s3")
-    s3_client.upload_file(log_file, LOGS_BUCKET, f"{LOGS_KEY_PREFIX}{log_file}")
+    # Drain the queued records into the log file before uploading it
+    log_listener.stop()
+    try:
+        s3.upload_file(
+            log_file,
+            LOGS_BUCKET,
+            f"{LOGS_KEY_PREFIX}{log_file}",
+            Config=TransferConfig(
+                multipart_threshold=8 * 1024 * 1024, max_concurrency=4
+            ),
+        )
+    finally:
+        log_listener.start()
     logger.info("Log file uploaded to S3.")
 
 
@@ -304,34 +574,37 @@ def main():
     try:
         # Extract
         last_collision_date = read_last_collision_date()
-        all_data_df = download_new_data(last_collision_date)
+        # Socrata computes the new record count and max crash_date for us
+        total_records, new_last_collision_date = query_new_data_stats(
+            last_collision_date
+        )
 
-        if all_data_df is None:
+        if total_records == 0:
             logger.info(
                 "No new data found since the last collision date. Nothing to process."
             )
         else:
-            record_count = all_data_df.count()
-            logger.info(f"Total new records downloaded: {record_count}")
-
-            # Update the last_collision_date
-            new_last_date_row = all_data_df.agg(
-                spark_max(col("crash_date")).alias("max_crash_date")
-            ).collect()[0]
-            new_last_collision_date = new_last_date_row["max_crash_date"]
-            new_last_collision_date = new_last_collision_date.split("T")[0]
+            all_data_df = download_new_data(
+                last_collision_date, new_last_collision_date, total_records
+            )
+            # The record count comes from the Socrata stats query, so no Spark
+            # count job is needed here
+            logger.info(f"Total new records downloaded: {total_records}")
 
             # Transform
-            processed_data_path = transform_data(all_data_df)
+            transform_data(all_data_df, total_records)
 
             # Load
-            load_data_into_redshift(processed_data_path)
+            manifest_path = write_manifest()
+            load_data_into_redshift(manifest_path)
 
+            # Only advance the watermark once the COPY has succeeded
             update_last_collision_date(new_last_collision_date)
 
     except Exception as e:
         logger.exception("An error occurred during the ETL process.")
     finally:
+        close_redshift_connection()
         upload_logs_to_s3()
         spark.stop()
 